@@ -1,23 +1,17 @@
-import os
 import streamlit as st
-from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from datetime import date
 
-load_dotenv()
-url = (
-    f"mysql+pymysql://{os.getenv('DB_USER')}:{os.getenv('DB_PASS')}"
-    f"@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}?charset=utf8mb4"
-)
-engine = create_engine(url, pool_pre_ping=True)
+from db import get_engine
+
+engine = get_engine()
 
 st.set_page_config(page_title="Pantry DB – Basic", page_icon="🥫", layout="wide")
 st.title("🥫 Pantry (MySQL) — Basic")
 
 with engine.begin() as conn:
     rows = conn.execute(text("""
-        SELECT id, name, qty, unit, category,
-               COALESCE(DATE_FORMAT(expires_on, '%Y-%m-%d'), NULL) AS expires_on,
+        SELECT id, name, qty, unit, category, expires_on,
                created_at, updated_at
         FROM ingredients ORDER BY name ASC
     """)).mappings().all()
@@ -1,31 +1,33 @@
 
-import os
 import re
 import json
-from datetime import date, datetime
-from typing import List, Dict, Any, Optional
-from datetime import datetime, date
+from datetime import date, timedelta
+from typing import Dict, Any, Iterator, Optional
 import math
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
+import pandas as pd
+import requests
 import streamlit as st
-from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from sqlalchemy import text
 from sqlalchemy.engine import Engine
 
 from langchain.prompts import ChatPromptTemplate
 from langchain_community.llms import Ollama
+import langchain_community.llms.ollama as ollama_llm_module
 from langchain.schema import StrOutputParser
+from langchain.schema.runnable import Runnable
 
+from db import ensure_expiry_index, get_engine, values_clause
+from ollama_utils import warm_up
+from recipe_prompts import SYSTEM_RECIPE, option_rule
 
 
 
 
-load_dotenv()
-DB_URL = (
-    f"mysql+pymysql://{os.getenv('DB_USER')}:{os.getenv('DB_PASS')}"
-    f"@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}?charset=utf8mb4"
-)
-
 
 OLLAMA_BASE_URL: Optional[str] = None 
 OLLAMA_MODEL = "llama3.1:latest"
@@ -34,52 +36,56 @@ st.set_page_config(page_title="🍳 AI Recipe Agent", page_icon="🍳", layout="
 st.title("🍳 AI Recipe Agent — MySQL + LangChain + Ollama")
 
 
+DDL_INGREDIENTS = """
+CREATE TABLE IF NOT EXISTS ingredients (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  name VARCHAR(191) NOT NULL,
+  qty DOUBLE DEFAULT 0,
+  unit VARCHAR(64) DEFAULT '',
+  category VARCHAR(64) DEFAULT '',
+  diet_type VARCHAR(16) NOT NULL DEFAULT 'unknown',
+  expires_on DATE NULL,
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  UNIQUE KEY unique_name (name),
+  KEY idx_ingredients_expires (expires_on)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+"""
+
+DDL_HISTORY = """
+CREATE TABLE IF NOT EXISTS recipe_history (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  dietary VARCHAR(64),
+  time_limit INT,
+  servings INT,
+  cuisine VARCHAR(128),
+  num_options INT,
+  ranked_snapshot MEDIUMTEXT,
+  result_markdown LONGTEXT
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+"""
+
 @st.cache_resource(show_spinner=False)
-def get_engine() -> Engine:
-    return create_engine(DB_URL, pool_pre_ping=True, pool_recycle=180)
-
-def ensure_tables(engine: Engine):
-    DDL_INGREDIENTS = """
-    CREATE TABLE IF NOT EXISTS ingredients (
-      id INT AUTO_INCREMENT PRIMARY KEY,
-      name VARCHAR(191) NOT NULL,
-      qty DOUBLE DEFAULT 0,
-      unit VARCHAR(64) DEFAULT '',
-      category VARCHAR(64) DEFAULT '',
-      diet_type VARCHAR(16) NOT NULL DEFAULT 'unknown',
-      expires_on DATE NULL,
-      created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-      updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-      UNIQUE KEY unique_name (name)
-    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-    """
-    DDL_HISTORY = """
-    CREATE TABLE IF NOT EXISTS recipe_history (
-      id INT AUTO_INCREMENT PRIMARY KEY,
-      created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-      dietary VARCHAR(64),
-      time_limit INT,
-      servings INT,
-      cuisine VARCHAR(128),
-      num_options INT,
-      ranked_snapshot MEDIUMTEXT,
-      result_markdown LONGTEXT
-    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-    """
-    with engine.begin() as conn:
+def ensure_tables(_engine: Engine):
+    """Runs the DDL once per process; later reruns skip it."""
+    with _engine.begin() as conn:
         conn.execute(text(DDL_INGREDIENTS))
         conn.execute(text(DDL_HISTORY))
+        ensure_expiry_index(conn)
 
-def list_ingredients(engine: Engine) -> List[Dict[str, Any]]:
-    with engine.begin() as conn:
-        rows = conn.execute(text("""
+@st.cache_data(ttl=60, show_spinner=False)
+def list_ingredients(_engine: Engine) -> pd.DataFrame:
+    with _engine.connect() as conn:
+        return pd.read_sql_query(text("""
             SELECT id, name, qty, unit, category, diet_type,
-                   DATE_FORMAT(expires_on, '%Y-%m-%d') AS expires_on,
-                   created_at, updated_at
+                   expires_on, created_at, updated_at
             FROM ingredients
             ORDER BY name ASC
-        """)).mappings().all()
-        return [dict(r) for r in rows]
+        """), conn, parse_dates=["created_at", "updated_at", "expires_on"])
+
+def clear_pantry_cache():
+    list_ingredients.clear()
 
 def upsert_ingredient(
     engine,
@@ -109,17 +115,55 @@ def upsert_ingredient(
             "diet_type": diet_type,
             "expires_on": expires_on
         })
+
+BULK_UPSERT_CHUNK = 1000
+
+def bulk_upsert_ingredients(engine: Engine, items: list[dict]) -> int:
+    """
+    Upsert many parsed items with one multi-row INSERT per chunk,
+    all inside a single transaction. Returns the number of rows sent.
+    """
+    cols = ("name", "qty", "unit", "category", "diet_type", "expires_on")
+    rows = [
+        {
+            "name": it["name"].strip().lower(),
+            "qty": float(it.get("qty") or 0),
+            "unit": it.get("unit") or "",
+            "category": it.get("category") or "",
+            "diet_type": it.get("diet_type") or "unknown",
+            "expires_on": it.get("expires_on"),
+        }
+        for it in items if (it.get("name") or "").strip()
+    ]
+    if not rows:
+        return 0
+
+    with engine.begin() as conn:
+        for start in range(0, len(rows), BULK_UPSERT_CHUNK):
+            values, params = values_clause(cols, rows[start:start + BULK_UPSERT_CHUNK])
+            conn.execute(text(f"""
+                INSERT INTO ingredients (name, qty, unit, category, diet_type, expires_on)
+                VALUES {values}
+                ON DUPLICATE KEY UPDATE
+                  qty = VALUES(qty),
+                  unit = VALUES(unit),
+                  category = VALUES(category),
+                  diet_type = VALUES(diet_type),
+                  expires_on = VALUES(expires_on)
+            """), params)
+    return len(rows)
+
 def delete_ingredient(engine: Engine, ingredient_id: int):
     with engine.begin() as conn:
         conn.execute(text("DELETE FROM ingredients WHERE id = :id"), {"id": ingredient_id})
 
-def list_history(engine: Engine, limit: int = 10):
-    with engine.begin() as conn:
-        rows = conn.execute(text("""
+@st.cache_data(ttl=60, show_spinner=False)
+def list_history(_engine: Engine, limit: int = 10):
+    with _engine.begin() as conn:
+        return conn.execute(text("""
             SELECT id, created_at, dietary, time_limit, servings, cuisine, num_options
             FROM recipe_history ORDER BY id DESC LIMIT :lim
         """), {"lim": limit}).all()
-        return rows
 
 def get_history(engine: Engine, hist_id: int):
     with engine.begin() as conn:
@@ -152,19 +196,38 @@ def apply_usage(engine: Engine, usage_items: list[dict]) -> dict:
     """
     updated, missing, corrected, adjusted = [], [], [], []
 
+    wanted = []
+    for it in usage_items:
+        raw_name = (it.get("name") or "").strip().lower()
+        qty  = float(it.get("qty") or 0)
+        unit = (it.get("unit") or "").strip().lower()
+        if raw_name and qty > 0:
+            wanted.append((raw_name, qty, unit))
+    if not wanted:
+        return {"updated": updated, "missing": missing, "corrected": corrected, "adjusted": adjusted}
+
+    names = sorted({n for n, _, _ in wanted})
+    params = {f"req_{i}": n for i, n in enumerate(names)}
+    flags = ", ".join(f"(name = :req_{i}) AS m_{i}" for i in range(len(names)))
     with engine.begin() as conn:
-        for it in usage_items:
-            raw_name = (it.get("name") or "").strip().lower()
-            qty  = float(it.get("qty") or 0)
-            unit = (it.get("unit") or "").strip().lower()
-
-            if not raw_name or qty <= 0:
-                continue
-
-            row = conn.execute(text(
-                "SELECT id, name, qty, unit FROM ingredients WHERE name = :name"
-            ), {"name": raw_name}).mappings().one_or_none()
-
+        # Compare against the column so MySQL's collation decides what matches (e.g. 'jalapeno'
+        # finds 'jalapeño'), and lock the rows so a concurrent delete can't be upserted back.
+        rows = conn.execute(text(f"""
+            SELECT name, qty, unit, {flags}
+            FROM ingredients
+            WHERE name IN ({", ".join(f":{k}" for k in params)})
+            FOR UPDATE
+        """), params).mappings().all()
+        pantry = {}
+        for r in rows:
+            row = {"name": r["name"], "qty": float(r["qty"]), "unit": r["unit"]}
+            for i, n in enumerate(names):
+                if r[f"m_{i}"]:
+                    pantry[n] = row
+
+        touched = {}
+        for raw_name, qty, unit in wanted:
+            row = pantry.get(raw_name)
             if not row:
                 missing.append(raw_name)
                 continue
@@ -173,17 +236,26 @@ def apply_usage(engine: Engine, usage_items: list[dict]) -> dict:
             if note:
                 adjusted.append(note)
 
-            new_qty = max(0.0, float(row["qty"]) - float(adj_qty))
-            conn.execute(text(
-                "UPDATE ingredients SET qty = :q WHERE id = :id"
-            ), {"q": new_qty, "id": row["id"]})
+            old_qty = row["qty"]
+            new_qty = max(0.0, old_qty - float(adj_qty))
+            row["qty"] = new_qty
+            touched[row["name"]] = new_qty
 
             updated.append({
                 "name": row["name"],
-                "old_qty": float(row["qty"]),
+                "old_qty": old_qty,
                 "new_qty": new_qty
             })
 
+        if touched:
+            values, params = values_clause(
+                ("name", "qty"), [{"name": n, "qty": q} for n, q in touched.items()]
+            )
+            conn.execute(text(f"""
+                INSERT INTO ingredients (name, qty) VALUES {values}
+                ON DUPLICATE KEY UPDATE qty = VALUES(qty)
+            """), params)
+
     return {"updated": updated, "missing": missing, "corrected": corrected, "adjusted": adjusted}
 
 PIECE_TO_GRAMS = {
@@ -261,15 +333,22 @@ def _extract_first_json_array(text: str) -> str | None:
                 return text[s:i+1]
     return None
 
+# History labels re-parse the same stored markdown on every rerun; cache_data survives reruns
+# (the script module is re-executed each time) and hands back a copy per call.
+@st.cache_data(show_spinner=False, max_entries=32)
 def parse_usage_from_markdown(md: str) -> list[dict]:
     if not md:
         return []
-    m = _USAGE_BLOCK_RE.search(md)
-    if m:
+    # One block per recipe when options are generated separately.
+    usage = []
+    for m in _USAGE_BLOCK_RE.finditer(md):
         try:
-            return json.loads(m.group("json").strip())
+            parsed = json.loads(m.group("json").strip())
         except Exception:
-            pass
+            continue
+        usage.extend(parsed if isinstance(parsed, list) else [parsed])
+    if usage:
+        return usage
     arr = _extract_first_json_array(md)
     if arr:
         try:
@@ -279,47 +358,34 @@ def parse_usage_from_markdown(md: str) -> list[dict]:
     return []
 
 
-def days_left(iso_date: Optional[str]) -> float:
-    if not iso_date:
-        return 9_999.0
-    try:
-        dt = datetime.strptime(iso_date, "%Y-%m-%d")
-    except ValueError:
-        return 9_999.0
-    return (dt - datetime.now()).total_seconds() / 86400.0
+_BOOST_CATEGORIES = ["dairy", "protein", "veg", "vegetable", "fruit"]
 
+@st.cache_data(ttl=60, show_spinner=False)
 def rank_ingredients(
-    items: List[Dict[str, Any]],
+    items: pd.DataFrame,
     selected_diet: str = "veg",
     exclude_non_veg: bool = True,
     exclude_eggs: bool = False,
     exclude_dairy: bool = False,
-) -> List[Dict[str, Any]]:
-    ranked = []
-    for it in items:
-        dleft = days_left(it.get("expires_on"))
-        prio = 1.0 / max(dleft, 0.25)
-
-       
-        cat = (it.get("category") or "").lower()
-        if cat in {"dairy", "protein", "veg", "vegetable", "fruit"}:
-            prio *= 1.2
-
-       
-        it_diet = (it.get("diet_type") or "unknown").lower()
-        if exclude_non_veg and it_diet == "non-veg":
-            prio *= 0.15   
-        if exclude_eggs and it_diet == "eggs-ok":
-            prio *= 0.4
-        if exclude_dairy and cat == "dairy":
-            prio *= 0.4
-        if selected_diet == "vegan" and cat == "dairy":
-            prio *= 0.4
-
-        ranked.append({**it, "_days_left": dleft, "_priority": prio})
-
-    ranked.sort(key=lambda x: (-x["_priority"], x["name"]))
-    return ranked
+) -> pd.DataFrame:
+    dleft = ((items["expires_on"] - pd.Timestamp.now()).dt.total_seconds() / 86400.0).fillna(9_999.0)
+    prio = 1.0 / dleft.clip(lower=0.25)
+
+    cat = items["category"].fillna("").str.lower()
+    it_diet = items["diet_type"].fillna("unknown").str.lower()
+
+    prio = prio.mask(cat.isin(_BOOST_CATEGORIES), prio * 1.2)
+    if exclude_non_veg:
+        prio = prio.mask(it_diet == "non-veg", prio * 0.15)
+    if exclude_eggs:
+        prio = prio.mask(it_diet == "eggs-ok", prio * 0.4)
+    if exclude_dairy:
+        prio = prio.mask(cat == "dairy", prio * 0.4)
+    if selected_diet == "vegan":
+        prio = prio.mask(cat == "dairy", prio * 0.4)
+
+    ranked = items.assign(_days_left=dleft, _priority=prio)
+    return ranked.sort_values(["_priority", "name"], ascending=[False, True], ignore_index=True)
 
 def extract_titles_from_md(md: str) -> list[str]:
     """Pull titles from the usage_json block (fallback: none)."""
@@ -331,39 +397,40 @@ def extract_titles_from_md(md: str) -> list[str]:
             titles.append(t)
     return titles
 
-def snapshot_block(ranked: List[Dict[str, Any]], limit: int = 14) -> str:
-    lines = []
-    for i, it in enumerate(ranked[:limit], start=1):
-        d = round(it["_days_left"], 1)
-        lines.append(f"{i}. {it['name']} {it['qty']}{it['unit']} | exp ~ {d}d | prio={round(it['_priority'],2)}")
+def snapshot_block(ranked: pd.DataFrame, limit: int = 14) -> str:
+    lines = [
+        f"{i}. {it['name']} {it['qty']}{it['unit']} | exp ~ {it['_days_left']:.1f}d | prio={it['_priority']:.2f}"
+        for i, it in enumerate(ranked.head(limit).to_dict("records"), start=1)
+    ]
     return "\n".join(lines) if lines else "(empty)"
 
-def guess_category(name: str) -> str:
-    n = name.lower()
-   
-    if any(k in n for k in ["chicken", "mutton", "goat", "lamb", "beef", "pork", "fish", "prawn", "shrimp", "seafood", "turkey", "bacon", "sausage"]):
-        return "protein"   
-   
-    if "egg" in n:
-        return "protein"
+def _keyword_re(words: list[str]) -> re.Pattern:
+    return re.compile("|".join(re.escape(w) for w in words))
+
+_MEAT_WORDS = ["chicken", "mutton", "goat", "lamb", "beef", "pork", "fish", "prawn", "shrimp", "seafood", "turkey", "bacon", "sausage"]
 
-    if any(k in n for k in ["milk", "paneer", "cheese", "yogurt", "curd", "butter", "ghee", "cream"]):
-        return "dairy"
+# Checked in order; the first category whose pattern hits wins.
+_CATEGORY_RULES = [
+    ("protein", _keyword_re(_MEAT_WORDS + ["egg"])),
+    ("dairy", _keyword_re(["milk", "paneer", "cheese", "yogurt", "curd", "butter", "ghee", "cream"])),
+    ("veg", _keyword_re(["tomato","onion","potato","carrot","spinach","capsicum","pepper","cucumber","cabbage","cauliflower","broccoli","okra","bhindi","brinjal","eggplant"])),
+    ("fruit", _keyword_re(["banana","apple","mango","orange","grape","berries","strawberry","pineapple","pear","papaya"])),
+    ("grain", _keyword_re(["rice","flour","atta","wheat","maida","bread","pasta","noodle","quinoa","oats","poha","suji","semolina"])),
+    ("condiment", _keyword_re(["salt","sugar","ketchup","sauce","vinegar","soy","mustard","pickle","masala","spice","chilli","chili","turmeric","cumin","coriander","garam"])),
+]
 
-    if any(k in n for k in ["tomato","onion","potato","carrot","spinach","capsicum","pepper","cucumber","cabbage","cauliflower","broccoli","okra","bhindi","brinjal","eggplant"]):
-        return "veg"
-    if any(k in n for k in ["banana","apple","mango","orange","grape","berries","strawberry","pineapple","pear","papaya"]):
-        return "fruit"
+_NONVEG_RE = _keyword_re(_MEAT_WORDS + ["ham","salami","anchovy","tuna"])
 
-    if any(k in n for k in ["rice","flour","atta","wheat","maida","bread","pasta","noodle","quinoa","oats","poha","suji","semolina"]):
-        return "grain"
-    if any(k in n for k in ["salt","sugar","ketchup","sauce","vinegar","soy","mustard","pickle","masala","spice","chilli","chili","turmeric","cumin","coriander","garam"]):
-        return "condiment"
+def guess_category(name: str) -> str:
+    n = name.lower()
+    for category, pattern in _CATEGORY_RULES:
+        if pattern.search(n):
+            return category
     return "other"
 
 def guess_diet_type(name: str) -> str:
     n = name.lower()
-    if any(k in n for k in ["chicken","mutton","goat","lamb","beef","pork","fish","prawn","shrimp","seafood","turkey","bacon","sausage","ham","salami","anchovy","tuna"]):
+    if _NONVEG_RE.search(n):
         return "non-veg"
     if "egg" in n:
         return "eggs-ok"
@@ -379,21 +446,21 @@ _QTY_UNIT_RE = re.compile(
     re.IGNORECASE | re.VERBOSE,
 )
 
-def parse_line_to_item(line: str, default_unit: str, default_days: int) -> Dict[str, Any]:
-    """
-    Accepts lines like:
-      'chicken breast 500g'
-      'eggs 6pcs'
-      'paneer 200 g'
-      'tomato'  (falls back to qty=1, default_unit)
-    """
-    line = line.strip()
-    if not line:
-        return {}
-    m = _QTY_UNIT_RE.match(line)
-    if not m:
-        return {}
+# Same grammar as _QTY_UNIT_RE, but anchored per line so a whole paste is scanned in one pass.
+# [^\S\n] is "any whitespace but newline", so NBSPs etc. separate tokens like .strip()/\s+ do.
+_BULK_RE = re.compile(
+    r"""^[^\S\n]*
+        (?P<name>[^\n]*?)
+        (?:[^\S\n]+(?P<qty>\d+(?:\.\d+)?)(?P<unit>[a-zA-Z]+))?
+        [^\S\n]*$
+    """,
+    re.IGNORECASE | re.VERBOSE | re.MULTILINE,
+)
+
+def _default_expiry(default_days: int) -> str:
+    return (date.today() + timedelta(days=default_days)).isoformat()
 
+def _item_from_match(m: re.Match, default_unit: str, expires_on: str) -> Dict[str, Any]:
     name = (m.group("name") or "").strip().lower()
     qty = 1.0
     unit = default_unit
@@ -405,47 +472,50 @@ def parse_line_to_item(line: str, default_unit: str, default_days: int) -> Dict[
     if m.group("unit"):
         unit = m.group("unit").lower().replace("cup", "cups")
 
-    category = guess_category(name)
-    diet_type = guess_diet_type(name)
-    expires_on = (date.today()).toordinal() + default_days
-    expires_on = date.fromordinal(expires_on).isoformat()
     return {
         "name": name,
         "qty": qty,
         "unit": unit,
-        "category": category,
-        "diet_type": diet_type,
+        "category": guess_category(name),
+        "diet_type": guess_diet_type(name),
         "expires_on": expires_on,
     }
 
-def is_expired(iso_date: str | None) -> bool:
-    if not iso_date:
-        return False
-    try:
-        d = datetime.strptime(iso_date, "%Y-%m-%d").date()
-    except ValueError:
-        return False
-    return d < date.today()
-
-def filter_items_by_expiry(items: list[dict], exclude_expired: bool) -> tuple[list[dict], list[dict]]:
+def parse_line_to_item(line: str, default_unit: str, default_days: int) -> Dict[str, Any]:
+    """
+    Accepts lines like:
+      'chicken breast 500g'
+      'eggs 6pcs'
+      'paneer 200 g'
+      'tomato'  (falls back to qty=1, default_unit)
+    """
+    line = line.strip()
+    if not line:
+        return {}
+    m = _QTY_UNIT_RE.match(line)
+    if not m:
+        return {}
+    return _item_from_match(m, default_unit, _default_expiry(default_days))
+
+def parse_bulk_text(bulk_text: str, default_unit: str, default_days: int) -> list[dict]:
+    """Parse a comma/newline separated paste into items; blank entries are skipped."""
+    expires_on = _default_expiry(default_days)
+    items = [
+        _item_from_match(m, default_unit, expires_on)
+        for m in _BULK_RE.finditer((bulk_text or "").replace(",", "\n"))
+    ]
+    return [it for it in items if it["name"]]
+
+def filter_items_by_expiry(items: pd.DataFrame, exclude_expired: bool) -> tuple[pd.DataFrame, pd.DataFrame]:
     """Returns (active_items, expired_items) given the toggle."""
-    active, expired = [], []
-    for it in items:
-        (expired if is_expired(it.get("expires_on")) else active).append(it)
+    is_expired_mask = items["expires_on"] < pd.Timestamp.today().normalize()
+    expired = items[is_expired_mask]
     if exclude_expired:
-        return active, expired
+        return items[~is_expired_mask], expired
     else:
         return items, expired  
 
 
-SYSTEM_RECIPE = """You are a helpful recipe creator that:
-- prioritizes soon-to-expire items,
-- maximizes use of the provided pantry,
-- defaults to Indian kitchens unless otherwise requested,
-- returns 2–3 options with: title, why-it-uses-expiring-items, total time, difficulty,
-  ingredients (quantities), step-by-step method, substitutions, and dietary notes.
-- do not invent unavailable ingredients unless optional substitutes."""
-
 USER_TEMPLATE = """Pantry (expiry-ranked):
 {ranked}
 
@@ -464,7 +534,7 @@ Rules:
 - STRICTLY avoid ingredients that violate the exclusions/dietary constraints.
 - Prefer at least 2 of the top 4 expiring items when possible.
 - Use mostly pantry items; mark any non-pantry as OPTIONAL.
-- Return clean, readable markdown for each recipe (title, time, ingredients, steps).
+- Return clean, readable markdown for the recipe (title, time, ingredients, steps).
 - STRICTLY NEVER use expired items. All items provided in 'Pantry (expiry-ranked)' are non-expired.
 - In usage_json, use realistic quantities that match pantry units:
   - meats in grams should be 100–500g, never 1–5g;
@@ -481,12 +551,30 @@ Rules:
   ]
 - In the JSON, normalize "name" to EXACT pantry item names; omit items not from pantry.
 
-Create {num_options} distinct recipes.
+{option_rule}
 """
 
-def generate_with_llm(ranked_block: str, dietary: str, time_limit: int, servings: int,
-                      cuisine: str, num_options: int,
-                      exclude_non_veg: bool, exclude_eggs: bool, exclude_dairy: bool) -> str:
+def _pooled_session() -> requests.Session:
+    """Keep-alive session sized for the concurrent option prompts."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=Retry(total=2, backoff_factor=0.2))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+class _PooledRequests:
+    """
+    Stand-in for the `requests` module inside langchain_community's Ollama wrapper:
+    `post` goes through a pooled session, every other attribute is the real module.
+    """
+    def __init__(self, session: requests.Session):
+        self.post = session.post
+
+    def __getattr__(self, name: str):
+        return getattr(requests, name)
+
+@st.cache_resource(show_spinner=False)
+def get_llm_chain() -> Runnable:
     prompt = ChatPromptTemplate.from_messages([
         ("system", SYSTEM_RECIPE),
         ("user", USER_TEMPLATE),
@@ -494,24 +582,49 @@ def generate_with_llm(ranked_block: str, dietary: str, time_limit: int, servings
     kwargs = {"model": OLLAMA_MODEL}
     if OLLAMA_BASE_URL:
         kwargs["base_url"] = OLLAMA_BASE_URL
+    # The Ollama wrapper posts through the module-level `requests.post`, which opens a
+    # fresh connection per call; route just that call through one pooled session.
+    # This relies on a private detail of langchain_community's Ollama._create_stream
+    # (checked against the 0.3.31 pinned in requirements.txt); re-check it when bumping the pin.
+    ollama_llm_module.requests = _PooledRequests(_pooled_session())
     llm = Ollama(**kwargs)
-    chain = prompt | llm | StrOutputParser()
-    user_vars = {
+    threading.Thread(target=warm_up, args=(llm,), daemon=True).start()
+    return prompt | llm | StrOutputParser()
+
+def generate_with_llm(ranked_block: str, dietary: str, time_limit: int, servings: int,
+                      cuisine: str, num_options: int,
+                      exclude_non_veg: bool, exclude_eggs: bool, exclude_dairy: bool) -> Iterator[str]:
+    base_vars = {
         "ranked": ranked_block,
         "dietary": dietary,
         "time_limit": time_limit,
         "servings": servings,
         "cuisine": cuisine,
-        "num_options": num_options,
         "exclude_non_veg": str(exclude_non_veg).lower(),
         "exclude_eggs": str(exclude_eggs).lower(),
         "exclude_dairy": str(exclude_dairy).lower(),
     }
-    return chain.invoke(user_vars)
+    inputs = [
+        {**base_vars, "option_rule": option_rule(i, num_options)}
+        for i in range(1, num_options + 1)
+    ]
+    chain = get_llm_chain()
+    if len(inputs) == 1:
+        yield from chain.stream(inputs[0])
+        return
+
+    # Options are independent prompts: stream the first one token by token while
+    # Ollama works on the rest concurrently, then show those as they finish.
+    with ThreadPoolExecutor(max_workers=len(inputs) - 1) as pool:
+        rest = [pool.submit(chain.invoke, inp) for inp in inputs[1:]]
+        yield from chain.stream(inputs[0])
+        for fut in as_completed(rest):
+            yield "\n\n---\n\n" + fut.result()
 
 
 engine = get_engine()
 ensure_tables(engine)
+get_llm_chain()  # first call per process also starts the model warm-up
 
 with st.sidebar:
     st.header("Preferences")
@@ -530,7 +643,7 @@ with st.sidebar:
     st.markdown("---")
     st.subheader("History")
 
-    hist_rows = list_history(engine, limit=10)  
+    hist_rows = list_history(engine, limit=10)
     display = ["(select)"]
     id_index = {"(select)": None}
 
@@ -577,6 +690,7 @@ with st.sidebar:
                                 st.success(f"Updated: {[u['name'] for u in result['updated']]}")
                             if result.get("missing"):
                                 st.warning(f"Missing in pantry (not deducted): {result['missing']}")
+                            clear_pantry_cache()
                             st.rerun()
             else:
                 st.info("No usage_json block detected in this history entry — cannot auto-deduct.")
@@ -595,22 +709,25 @@ ranked = rank_ingredients(
     exclude_dairy=exclude_dairy,
 )
 
-if ranked:
+if not ranked.empty:
 
     st.dataframe(
-        [
-            {k: v for k, v in it.items() if not k.startswith("_")}
-            | {"days_left": round(it["_days_left"], 1), "priority": round(it["_priority"], 2)}
-            for it in ranked
-        ],
+        ranked.drop(columns=["_days_left", "_priority"]).assign(
+            expires_on=ranked["expires_on"].dt.strftime("%Y-%m-%d"),
+            days_left=ranked["_days_left"].round(1),
+            priority=ranked["_priority"].round(2),
+        ),
         width="stretch",
     )
 else:
     st.info("No ingredients yet. Add some below!")
 
-if expired_items:
+if not expired_items.empty:
     with st.expander(f"⚠️ {len(expired_items)} expired item(s)"):
-        st.dataframe(expired_items, width="stretch")
+        st.dataframe(
+            expired_items.assign(expires_on=expired_items["expires_on"].dt.strftime("%Y-%m-%d")),
+            width="stretch",
+        )
 
 
 st.markdown("### Add / Update Ingredient")
@@ -628,6 +745,7 @@ with st.form("add_form"):
         else:
             upsert_ingredient(engine, name, float(qty), unit, category, diet_type, expires.isoformat() if expires else None)
             st.success(f"Saved: {name}")
+            clear_pantry_cache()
             st.rerun()
 
 
@@ -648,44 +766,28 @@ with st.expander("Paste a list (comma/newline separated)"):
         do_overwrite = st.checkbox("Overwrite if exists", value=True, help="Always upsert by name.")
 
     if st.button("Add all"):
-        lines = []
-        
-        for part in (bulk_text or "").replace(",", "\n").splitlines():
-            if part.strip():
-                lines.append(part.strip())
-
-        if not lines:
+        if not (bulk_text or "").replace(",", "").strip():
             st.warning("No lines found.")
         else:
-            added = []
-            for ln in lines:
-                item = parse_line_to_item(ln, default_unit=default_unit, default_days=int(default_days))
-                if not item:
-                    continue
-                
-                upsert_ingredient(
-                    engine,
-                    name=item["name"],
-                    qty=float(item["qty"]),
-                    unit=item["unit"],
-                    category=item["category"],
-                    expires_on=item["expires_on"],
-                )
-                added.append(item["name"])
+            parsed_items = parse_bulk_text(bulk_text, default_unit=default_unit, default_days=int(default_days))
+            bulk_upsert_ingredients(engine, parsed_items)
+            added = [it["name"] for it in parsed_items]
             if added:
                 st.success(f"Added/updated: {', '.join(added)}")
+                clear_pantry_cache()
                 st.rerun()
             else:
                 st.info("Nothing parsed from the input.")
 
 
 with st.expander("Delete an ingredient"):
-    if items:
-        choice = st.selectbox("Select", [f"{it['id']} • {it['name']} ({it['qty']}{it['unit']})" for it in items])
+    if not items.empty:
+        choice = st.selectbox("Select", [f"{it['id']} • {it['name']} ({it['qty']}{it['unit']})" for it in items.to_dict("records")])
         if st.button("Delete selected"):
             del_id = int(choice.split("•")[0].strip())
             delete_ingredient(engine, del_id)
             st.success("Deleted.")
+            clear_pantry_cache()
             st.rerun()
     else:
         st.caption("No items to delete.")
@@ -695,13 +797,13 @@ st.markdown("---")
 
 st.header("✨ Generate Recipes from Pantry")
 if st.button("Generate Recipes"):
-    if not ranked:
+    if ranked.empty:
         st.warning("Pantry is empty. Add some items first.")
     else:
         snap = snapshot_block(ranked)
         with st.spinner(f"Calling {OLLAMA_MODEL} via Ollama…"):
             try:
-                md = generate_with_llm(
+                md = st.write_stream(generate_with_llm(
                     ranked_block=snap,
                     dietary=dietary,
                     time_limit=time_limit,
@@ -711,7 +813,7 @@ if st.button("Generate Recipes"):
                     exclude_non_veg=exclude_non_veg,
                     exclude_eggs=exclude_eggs,
                     exclude_dairy=exclude_dairy,
-     )
+                ))
                 save_history(engine, {
                     "dietary": dietary,
                     "time_limit": time_limit,
@@ -719,8 +821,8 @@ if st.button("Generate Recipes"):
                     "cuisine": cuisine,
                     "num_options": num_options
                 }, snap, md)
+                list_history.clear()
                 st.success("Recipes generated ✅")
-                st.markdown(md)
     
                 usage = parse_usage_from_markdown(md)
                 if not usage:
@@ -741,6 +843,7 @@ if st.button("Generate Recipes"):
                                     st.success(f"Updated: {[u['name'] for u in result['updated']]}")
                                 if result["missing"]:
                                     st.warning(f"Missing in pantry (not deducted): {result['missing']}")
+                                clear_pantry_cache()
                                 st.rerun()
             except Exception as e:
                 st.error(f"LLM error: {e}")
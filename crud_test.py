@@ -1,13 +1,8 @@
-import os
-from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 
-load_dotenv()
-url = (
-    f"mysql+pymysql://{os.getenv('DB_USER')}:{os.getenv('DB_PASS')}"
-    f"@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}?charset=utf8mb4"
-)
-engine = create_engine(url, pool_pre_ping=True)
+from db import get_engine
+
+engine = get_engine()
 
 with engine.begin() as conn:
     conn.execute(text("""
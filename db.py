@@ -0,0 +1,60 @@
+import os
+from functools import lru_cache
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+
+load_dotenv()
+DB_URL = (
+    f"mysql+pymysql://{os.getenv('DB_USER')}:{os.getenv('DB_PASS')}"
+    f"@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}?charset=utf8mb4"
+)
+
+
+@lru_cache(maxsize=None)
+def get_engine(pool_pre_ping: bool = True, pool_recycle: int = 180) -> Engine:
+    """
+    One pooled engine per process (per setting combination), shared by every
+    script that imports it. One-shot scripts can skip the per-checkout ping.
+    """
+    return create_engine(
+        DB_URL,
+        pool_pre_ping=pool_pre_ping,
+        pool_recycle=pool_recycle,
+        pool_size=10,
+        max_overflow=20,
+        pool_timeout=30,
+        pool_use_lifo=True,
+        future=True,
+        connect_args={"connect_timeout": 5},
+    )
+
+
+# Created by init_db.py and by the CLI (which is its only user), so a fresh database gets it either way.
+DDL_LLM_CACHE = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+  prompt_hash CHAR(64) PRIMARY KEY,
+  model VARCHAR(128),
+  result_markdown LONGTEXT,
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+"""
+
+
+def values_clause(cols: tuple[str, ...], rows: list[dict]) -> tuple[str, dict]:
+    """Build '(:a_0, :b_0), (:a_1, :b_1), ...' plus the matching bind params for a multi-row INSERT."""
+    values, params = [], {}
+    for i, row in enumerate(rows):
+        values.append("(" + ", ".join(f":{c}_{i}" for c in cols) + ")")
+        params.update({f"{c}_{i}": row[c] for c in cols})
+    return ", ".join(values), params
+
+
+def ensure_expiry_index(conn):
+    """Add idx_ingredients_expires to tables created before it existed (MySQL has no CREATE INDEX IF NOT EXISTS)."""
+    has_idx = conn.execute(text(
+        "SHOW INDEX FROM ingredients WHERE Key_name = 'idx_ingredients_expires'"
+    )).first()
+    if not has_idx:
+        conn.execute(text("CREATE INDEX idx_ingredients_expires ON ingredients (expires_on)"))
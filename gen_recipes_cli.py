@@ -1,50 +1,20 @@
 import os
 import argparse
+import asyncio
+import hashlib
+import threading
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Dict, Any, Sequence, Tuple
 
-from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
+from sqlalchemy import bindparam, text
 from sqlalchemy.exc import SQLAlchemyError
 
-from langchain.prompts import ChatPromptTemplate
-from langchain_community.llms import Ollama
-from langchain.schema import StrOutputParser
+from db import DDL_LLM_CACHE, ensure_expiry_index, get_engine
+from ollama_utils import warm_up
+from recipe_prompts import SYSTEM_RECIPE, option_rule
 
-load_dotenv()
-DB_URL = (
-    f"mysql+pymysql://{os.getenv('DB_USER')}:{os.getenv('DB_PASS')}"
-    f"@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}?charset=utf8mb4"
-)
-
-def days_left(iso_date: Optional[str]) -> float:
-    if not iso_date:
-        return 9_999.0
-    try:
-        dt = datetime.strptime(iso_date, "%Y-%m-%d")
-    except ValueError:
-        return 9_999.0
-    return (dt - datetime.now()).total_seconds() / 86400.0
-
-def rank_ingredients(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    ranked = []
-    for it in items:
-        dleft = days_left(it.get("expires_on"))
-        prio = 1.0 / max(dleft, 0.25)
-        cat = (it.get("category") or "").lower()
-        if cat in {"dairy", "protein", "veg", "vegetable", "fruit"}:
-            prio *= 1.2
-        ranked.append({**it, "_days_left": dleft, "_priority": prio})
-    ranked.sort(key=lambda x: (-x["_priority"], x["name"]))
-    return ranked
-
-SYSTEM_RECIPE = """You are a helpful recipe creator that:
-- prioritizes soon-to-expire items,
-- maximizes use of the provided pantry,
-- defaults to Indian kitchens unless otherwise requested,
-- returns 2–3 options with: title, why-it-uses-expiring-items, total time, difficulty,
-  ingredients (quantities), step-by-step method, substitutions, and dietary notes.
-- do not invent unavailable ingredients unless optional substitutes."""
 
 USER_TEMPLATE = """Pantry (expiry-ranked):
 {ranked}
@@ -58,29 +28,97 @@ User constraints:
 Rules:
 - Prefer at least 2 of the top 4 expiring items when possible.
 - Use mostly pantry items; mark any non-pantry as OPTIONAL.
+- Return clean, readable markdown.
 
-Create {num_options} distinct recipes.
-Return clean, readable markdown.
+{option_rule}
 """
 
-def build_ranked_block(ranked: List[Dict[str, Any]], limit: int = 14) -> str:
-    lines = []
-    for i, it in enumerate(ranked[:limit], start=1):
-        d = round(it["_days_left"], 1)
-        lines.append(f"{i}. {it['name']} {it['qty']}{it['unit']} | exp ~ {d}d | prio={round(it['_priority'],2)}")
+# langchain is imported lazily: it is slow to import, and --help or an empty pantry never need it
+# (unless --prewarm starts the warm-up thread, which imports it in the background).
+@lru_cache(maxsize=1)
+def recipe_prompt():
+    """
+    Built once per process. USER_TEMPLATE is rendered in amain (for the
+    snapshot and cache key) and passed through as-is.
+    """
+    from langchain.prompts import ChatPromptTemplate
+    return ChatPromptTemplate.from_messages([
+        ("system", SYSTEM_RECIPE),
+        ("user", "{rendered}"),
+    ])
+
+def build_llm(model: str):
+    from langchain_community.llms import Ollama
+    return Ollama(model=model)
+
+def build_chain(model: str):
+    from langchain.schema import StrOutputParser
+    return recipe_prompt() | build_llm(model) | StrOutputParser()
+
+def build_ranked_block(ranked: Sequence[Tuple[str, float, str, float, float]]) -> str:
+    """`ranked` is already the top-K (name, qty, unit, days_left, priority) rows, in order."""
+    lines = [
+        f"{i}. {name} {qty}{unit} | exp ~ {days:.1f}d | prio={prio:.2f}"
+        for i, (name, qty, unit, days, prio) in enumerate(ranked, start=1)
+    ]
     return "\n".join(lines) if lines else "(empty)"
 
-def fetch_ingredients(engine) -> List[Dict[str, Any]]:
+# Ranking constants; baked into the SQL below, which is built once per process.
+_BOOST_CATS = frozenset({"dairy", "protein", "veg", "vegetable", "fruit"})
+_BOOST_FACTOR = 1.2
+_MIN_DAYS = 0.25
+RANKED_LIMIT = 14  # pantry lines shown to the model
+
+# e0 literals keep the math in DOUBLE; 1.0 / x would be DECIMAL with 5 decimals and tie long-dated items.
+_RANKED_SQL = text(f"""
+    SELECT t.name, t.qty, t.unit, t._days_left,
+           (1e0 / GREATEST(t._days_left, {_MIN_DAYS}e0))
+           * CASE WHEN LOWER(t.category) IN ({", ".join(f"'{c}'" for c in sorted(_BOOST_CATS))})
+                  THEN {_BOOST_FACTOR}e0 ELSE 1e0 END
+           AS _priority
+    FROM (
+        SELECT name, qty, unit, category,
+               COALESCE(TIMESTAMPDIFF(SECOND, :now, expires_on) / 86400e0, 9999e0) AS _days_left
+        FROM ingredients
+    ) AS t
+    ORDER BY _priority DESC, t.name ASC
+    LIMIT :lim
+""")
+
+def fetch_ranked_ingredients(engine, limit: int = RANKED_LIMIT) -> Sequence[Tuple[str, float, str, float, float]]:
+    """
+    Top `limit` pantry rows by expiry priority, scored by MySQL:
+    1 / max(days left, 0.25), boosted 1.2x for perishable categories.
+    Rows are plain (name, qty, unit, days_left, priority) tuples.
+    Days left are measured from the client's clock, not the DB server's.
+    """
     with engine.begin() as conn:
-        rows = conn.execute(text("""
-            SELECT id, name, qty, unit, category,
-                   DATE_FORMAT(expires_on, '%Y-%m-%d') AS expires_on,
-                   created_at, updated_at
-            FROM ingredients
-        """)).mappings().all()
-        return [dict(r) for r in rows]
+        return conn.execute(_RANKED_SQL, {"now": datetime.now(), "lim": limit}).all()
+
+# Bump when the DDL below changes so existing sentinels stop matching.
+SCHEMA_VERSION = "3"
+_TABLES_READY = False
+
+def _schema_sentinel() -> Path:
+    key = f"{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}#{SCHEMA_VERSION}"
+    digest = hashlib.sha256(key.encode()).hexdigest()[:16]
+    return Path.home() / ".cache" / "recipe-ai-agent" / f"schema_ok-{digest}"
+
+def forget_tables():
+    """Drop the 'schema is ready' markers so the next ensure_tables() runs the DDL again."""
+    global _TABLES_READY
+    _TABLES_READY = False
+    _schema_sentinel().unlink(missing_ok=True)
 
 def ensure_tables(engine):
+    global _TABLES_READY
+    if _TABLES_READY:
+        return
+    sentinel = _schema_sentinel()
+    if sentinel.exists():
+        _TABLES_READY = True
+        return
+
     DDL_INGREDIENTS = """
     CREATE TABLE IF NOT EXISTS ingredients (
       id INT AUTO_INCREMENT PRIMARY KEY,
@@ -91,7 +129,8 @@ def ensure_tables(engine):
       expires_on DATE NULL,
       created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
       updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-      UNIQUE KEY unique_name (name)
+      UNIQUE KEY unique_name (name),
+      KEY idx_ingredients_expires (expires_on)
     ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
     """
     DDL_HISTORY = """
@@ -110,6 +149,14 @@ def ensure_tables(engine):
     with engine.begin() as conn:
         conn.execute(text(DDL_INGREDIENTS))
         conn.execute(text(DDL_HISTORY))
+        conn.execute(text(DDL_LLM_CACHE))
+        ensure_expiry_index(conn)
+    _TABLES_READY = True
+    try:
+        sentinel.parent.mkdir(parents=True, exist_ok=True)
+        sentinel.touch()
+    except OSError:
+        pass
 
 def save_history(engine, params: Dict[str, Any], snapshot: str, markdown: str):
     with engine.begin() as conn:
@@ -126,40 +173,52 @@ def save_history(engine, params: Dict[str, Any], snapshot: str, markdown: str):
             "md": markdown
         })
 
-def main():
+def positive_int(value: str) -> int:
+    n = int(value)
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {n}")
+    return n
+
+async def amain():
     parser = argparse.ArgumentParser(description="Generate recipes from pantry (MySQL → LangChain → Ollama).")
     parser.add_argument("--dietary", default="veg", help="none|veg|eggs-ok|vegan|non-veg")
     parser.add_argument("--time_limit", type=int, default=30)
     parser.add_argument("--servings", type=int, default=2)
     parser.add_argument("--cuisine", default="Indian")
-    parser.add_argument("--num_options", type=int, default=2)
+    parser.add_argument("--num_options", type=positive_int, default=2)
     parser.add_argument("--model", default="llama3.1:latest", help="Ollama model tag")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore cached LLM results and regenerate")
+    parser.add_argument("--prewarm", action="store_true",
+                        help="Load the model while the pantry is fetched (even if every option turns out cached)")
     args = parser.parse_args()
 
+    if args.prewarm:
+        # Overlap the model's cold load (and the langchain import) with the DB round-trips below.
+        threading.Thread(target=lambda: warm_up(build_llm(args.model)), daemon=True).start()
+
     try:
-        from sqlalchemy import create_engine
-        engine = create_engine(DB_URL, pool_pre_ping=True, pool_recycle=180)
+        engine = get_engine(pool_recycle=60)
         ensure_tables(engine)
     except SQLAlchemyError as e:
         print("DB error:", e)
         return
 
-    items = fetch_ingredients(engine)
-    if not items:
+    try:
+        ranked = fetch_ranked_ingredients(engine)
+    except SQLAlchemyError as e:
+        # A stale sentinel (e.g. the database was recreated) must not skip the DDL forever.
+        forget_tables()
+        print("DB error:", e)
+        return
+    if not ranked:
         print("Pantry is empty. Add ingredients first (via your Streamlit UI).")
         return
 
-    ranked = rank_ingredients(items)
     ranked_block = build_ranked_block(ranked)
 
 
     try:
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", SYSTEM_RECIPE),
-            ("user", USER_TEMPLATE),
-        ])
-        llm = Ollama(model=args.model)  
-        chain = prompt | llm | StrOutputParser()
+        chain = build_chain(args.model)
 
         user_vars = {
             "ranked": ranked_block,
@@ -167,18 +226,58 @@ def main():
             "time_limit": args.time_limit,
             "servings": args.servings,
             "cuisine": args.cuisine,
-            "num_options": args.num_options,
         }
 
+        variants = [
+            {"rendered": USER_TEMPLATE.format(
+                **user_vars, option_rule=option_rule(i, args.num_options)
+            )}
+            for i in range(1, args.num_options + 1)
+        ]
+
         print("\n=== Prompt snapshot ===")
-        print(USER_TEMPLATE.format(**user_vars))
+        print(variants[0]["rendered"])
         print("=======================\n")
 
-        print("Asking model… (", args.model, ")")
-        result_md = chain.invoke(user_vars)
+        hashes = [prompt_hash(args.model, v["rendered"]) for v in variants]
+        cached = {}
+        if not args.no_cache:
+            try:
+                cached = get_cached_results(engine, hashes)
+            except SQLAlchemyError as e:
+                # The cache is only an optimisation; regenerate, and re-run the DDL next time.
+                forget_tables()
+                print("Skipping LLM cache:", e)
+        pending = [(h, v) for h, v in zip(hashes, variants) if h not in cached]
+        if cached:
+            print("Using", len(hashes) - len(pending), "cached recipe(s).")
+
+        fresh = {}
+        if pending:
+            # One request per option; Ollama serves them concurrently up to OLLAMA_NUM_PARALLEL.
+            print("Asking model… (", args.model, ") for", len(pending), "recipe(s)")
+            tasks = {h: asyncio.create_task(chain.ainvoke(v)) for h, v in pending[1:]}
 
         print("\n=== Recipes ===\n")
-        print(result_md)
+        for n, h in enumerate(hashes):
+            if n:
+                print("\n---\n")
+            if h in cached:
+                print(cached[h])
+            elif h == pending[0][0]:
+                # Stream the first fresh option while the rest generate in the background.
+                fresh[h] = await stream_to_stdout(chain, pending[0][1])
+            else:
+                fresh[h] = await tasks[h]
+                print(fresh[h])
+        if fresh:
+            try:
+                put_cached_results(engine, args.model, fresh)
+            except SQLAlchemyError as e:
+                forget_tables()
+                print("Could not cache results:", e)
+
+        result_md = "\n\n---\n\n".join(cached.get(h) or fresh[h] for h in hashes)
 
         save_history(engine, {
             "dietary": args.dietary,
@@ -190,11 +289,45 @@ def main():
 
         print("\n(Saved to recipe_history.)")
 
+    except SQLAlchemyError as e:
+        forget_tables()
+        print("DB error:", e)
     except Exception as e:
         print("LLM error:", e)
         print("Tip: ensure Ollama is running and the model is pulled:")
         print("  1) ollama serve   (usually auto-starts)")
         print("  2) ollama pull", args.model)
 
+async def stream_to_stdout(chain, user_vars: Dict[str, Any]) -> str:
+    chunks = []
+    async for tok in chain.astream(user_vars):
+        print(tok, end="", flush=True)
+        chunks.append(tok)
+    print()
+    return "".join(chunks)
+
+def prompt_hash(model: str, rendered_user: str) -> str:
+    return hashlib.sha256("\x00".join((SYSTEM_RECIPE, rendered_user, model)).encode()).hexdigest()
+
+def get_cached_results(engine, hashes: List[str]) -> Dict[str, str]:
+    with engine.begin() as conn:
+        rows = conn.execute(
+            text("SELECT prompt_hash, result_markdown FROM llm_cache WHERE prompt_hash IN :hashes")
+                .bindparams(bindparam("hashes", expanding=True)),
+            {"hashes": hashes},
+        ).all()
+    return {h: md for h, md in rows}
+
+def put_cached_results(engine, model: str, results: Dict[str, str]):
+    with engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO llm_cache (prompt_hash, model, result_markdown)
+            VALUES (:h, :model, :md)
+            ON DUPLICATE KEY UPDATE result_markdown=VALUES(result_markdown), created_at=CURRENT_TIMESTAMP
+        """), [{"h": h, "model": model, "md": md} for h, md in results.items()])
+
+def main():
+    asyncio.run(amain())
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
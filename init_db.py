@@ -1,13 +1,8 @@
-import os
-from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 
-load_dotenv()
-url = (
-    f"mysql+pymysql://{os.getenv('DB_USER')}:{os.getenv('DB_PASS')}"
-    f"@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}?charset=utf8mb4"
-)
-engine = create_engine(url, pool_pre_ping=True)
+from db import DDL_LLM_CACHE, ensure_expiry_index, get_engine
+
+engine = get_engine(pool_pre_ping=False)
 
 DDL_INGREDIENTS = """
 CREATE TABLE IF NOT EXISTS ingredients (
@@ -19,7 +14,8 @@ CREATE TABLE IF NOT EXISTS ingredients (
   expires_on DATE NULL,
   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
   updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-  UNIQUE KEY unique_name (name)
+  UNIQUE KEY unique_name (name),
+  KEY idx_ingredients_expires (expires_on)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 """
 
@@ -40,4 +36,6 @@ CREATE TABLE IF NOT EXISTS recipe_history (
 with engine.begin() as conn:
     conn.execute(text(DDL_INGREDIENTS))
     conn.execute(text(DDL_HISTORY))
+    conn.execute(text(DDL_LLM_CACHE))
+    ensure_expiry_index(conn)
     print("Tables ensured.")
\ No newline at end of file
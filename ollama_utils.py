@@ -0,0 +1,6 @@
+def warm_up(llm) -> None:
+    """Ask for a single token so Ollama loads the model before the first real request."""
+    try:
+        llm.invoke(" ", num_predict=1)
+    except Exception:
+        pass
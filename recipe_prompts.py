@@ -0,0 +1,29 @@
+SYSTEM_RECIPE = """You are a helpful recipe creator that:
+- prioritizes soon-to-expire items,
+- maximizes use of the provided pantry,
+- defaults to Indian kitchens unless otherwise requested,
+- returns ONE recipe per request with: title, why-it-uses-expiring-items, total time, difficulty,
+  ingredients (quantities), step-by-step method, substitutions, and dietary notes.
+- do not invent unavailable ingredients unless optional substitutes."""
+
+# One style hint per option so independently generated recipes don't collapse into the same dish.
+# Kept cuisine-neutral: the cuisine itself comes from the user constraints.
+OPTION_STYLES = (
+    "a saucy, simmered dish",
+    "a dry, pan-cooked or roasted dish",
+    "a one-pot rice, grain or noodle dish",
+)
+
+
+def option_rule(recipe_index: int, num_options: int) -> str:
+    """
+    Fills the {option_rule} slot of each entry point's user template; every option is its
+    own request. The distinctness/style hint is only added when there are other options.
+    """
+    if num_options <= 1:
+        return "Create exactly ONE recipe."
+    style = OPTION_STYLES[(recipe_index - 1) % len(OPTION_STYLES)]
+    return (
+        f"Create exactly ONE recipe: option {recipe_index} of {num_options}.\n"
+        f"The other options are written separately, so lean towards {style} to keep them distinct."
+    )
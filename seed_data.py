@@ -1,14 +1,9 @@
-import os
 from datetime import date, timedelta
-from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 
-load_dotenv()
-DB_URL = (
-    f"mysql+pymysql://{os.getenv('DB_USER')}:{os.getenv('DB_PASS')}"
-    f"@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}?charset=utf8mb4"
-)
-engine = create_engine(DB_URL, pool_pre_ping=True)
+from db import get_engine, values_clause
+
+engine = get_engine(pool_pre_ping=False)
 
 today = date.today()
 
@@ -62,19 +57,21 @@ items = [
     ("rajma (kidney beans)",500,"g", "protein",   "vegan",   today + timedelta(days=300)),
 ]
 
+# One multi-row INSERT: a single statement to parse and a single round-trip for the whole seed.
+cols = ("name", "qty", "unit", "category", "diet_type", "expires_on")
+values, params = values_clause(cols, [
+    dict(zip(cols, (name, qty, unit, category, diet_type, exp.isoformat())))
+    for name, qty, unit, category, diet_type, exp in items
+])
+
 with engine.begin() as conn:
-    for name, qty, unit, category, diet_type, exp in items:
-        conn.execute(text("""
-            INSERT INTO ingredients (name, qty, unit, category, diet_type, expires_on)
-            VALUES (:name, :qty, :unit, :category, :diet_type, :expires_on)
-            ON DUPLICATE KEY UPDATE
-              qty=VALUES(qty), unit=VALUES(unit),
-              category=VALUES(category), diet_type=VALUES(diet_type),
-              expires_on=VALUES(expires_on)
-        """), {
-            "name": name, "qty": qty, "unit": unit,
-            "category": category, "diet_type": diet_type,
-            "expires_on": exp.isoformat()
-        })
+    conn.execute(text(f"""
+        INSERT INTO ingredients (name, qty, unit, category, diet_type, expires_on)
+        VALUES {values}
+        ON DUPLICATE KEY UPDATE
+          qty=VALUES(qty), unit=VALUES(unit),
+          category=VALUES(category), diet_type=VALUES(diet_type),
+          expires_on=VALUES(expires_on)
+    """), params)
 
 print("Seeded sample data ✔")
\ No newline at end of file